@@ -1,3 +1,5 @@
-from app.agent.graph import create_agent_executor
+from app.agent.batcher import MicroBatcher
+from app.agent.cache import ResponseCache
+from app.agent.graph import bind_agent_tools, create_agent_executor, create_llm, generate_direct_response, needs_tools
 
-__all__ = ["create_agent_executor"] 
\ No newline at end of file
+__all__ = ["MicroBatcher", "ResponseCache", "bind_agent_tools", "create_agent_executor", "create_llm", "generate_direct_response", "needs_tools"] 
\ No newline at end of file
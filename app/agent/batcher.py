@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any, List, Optional, Set, Tuple
+
+from langchain_core.runnables import Runnable
+
+
+class MicroBatcher:
+    """
+    将短时间内到达的LLM请求合并为一批，通过 llm.abatch 发送
+    
+    只有模型服务商提供批量补全接口时合并才有收益。Gemini 没有这样的接口，
+    ChatGoogleGenerativeAI.abatch 仍是逐个并发调用 ainvoke，因此默认不等待、
+    直接转发请求。
+    """
+    
+    def __init__(self, llm: Runnable, max_batch_size: int = 16, max_wait: float = 0):
+        """
+        初始化批处理器
+        
+        Args:
+            llm: LLM客户端
+            max_batch_size: 每批最多合并的请求数
+            max_wait: 收集一批请求的最长等待时间（秒），为 0 时不合并，直接调用LLM
+        """
+        self._llm = llm
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+    
+    async def ainvoke(self, messages: List[Any]) -> Any:
+        """
+        提交一次LLM调用并等待结果
+        
+        Args:
+            messages: 发送给LLM的消息列表
+            
+        Returns:
+            LLM的响应消息
+        """
+        if self._max_wait <= 0:
+            return await self._llm.ainvoke(messages)
+        
+        if self._worker is None:
+            # 首次调用时在当前事件循环中启动后台消费者
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._consume())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((messages, future))
+        return await future
+    
+    async def aclose(self) -> None:
+        """停止后台消费者，应用退出时调用"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(self._worker, *self._batches, return_exceptions=True)
+        self._worker = None
+    
+    async def _consume(self) -> None:
+        """后台消费者：收集一批请求后并发发送，不等待上一批完成"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[List[Any], asyncio.Future]]) -> None:
+        """发送一批请求，并将结果分发给各自的等待者"""
+        try:
+            results = await self._llm.abatch([messages for messages, _ in batch], return_exceptions=True)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, future), result in zip(batch, results):
+            # 请求方可能已经取消等待
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
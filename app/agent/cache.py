@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import orjson
+from cachetools import TTLCache
+
+
+class ResponseCache:
+    """基于问题和聊天历史的精确匹配响应缓存"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        """
+        初始化缓存
+        
+        Args:
+            maxsize: 最多缓存的回答数量
+            ttl: 缓存有效期（秒）
+        """
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = asyncio.Lock()
+    
+    @staticmethod
+    def make_key(question: str, chat_history: List[Dict[str, str]], model: str, temperature: float) -> str:
+        """
+        根据请求内容和模型参数生成缓存键
+        
+        Returns:
+            缓存键
+        """
+        payload = orjson.dumps(
+            {
+                "question": question,
+                "chat_history": chat_history,
+                "model": model,
+                "temperature": temperature,
+            },
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.blake2b(payload).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的回答，未命中时返回 None"""
+        async with self._lock:
+            return self._cache.get(key)
+    
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """缓存回答"""
+        async with self._lock:
+            self._cache[key] = value
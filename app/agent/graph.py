@@ -1,13 +1,18 @@
-import json
+import asyncio
+import operator
 import os
-from typing import Dict, List, Any, Annotated, TypedDict, Optional
+from typing import Dict, List, Any, Annotated, TypedDict, Optional, Union
 
+import orjson
 import langgraph.graph as lg
 from langgraph.graph import StateGraph, START, END
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage, AIMessage
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import Runnable
+from langchain_core.messages import ToolMessage, convert_to_messages, message_chunk_to_message
 
+from app.agent.batcher import MicroBatcher
 from app.tools import TOOLS
 
 
@@ -15,9 +20,18 @@ class AgentState(TypedDict):
     """代理的状态类型"""
     question: str
     chat_history: list[dict]
-    messages: list[dict]
+    # 各节点只返回新增的消息，由 LangGraph 追加到已有消息之后
+    messages: Annotated[list, operator.add]
     tool_calls: list[dict]
     tool_results: Optional[list[dict]]
+    # 本次请求中所有轮次执行过的工具名称，tool_results 只保留最近一轮
+    executed_tools: Annotated[list[str], operator.add]
+    # 任一轮次中有工具执行失败或只返回了兜底内容
+    tool_errors: Annotated[bool, operator.or_]
+    # 流式生成期间已开始执行的工具任务，按工具调用ID索引
+    pending_tools: Optional[dict[str, asyncio.Task]]
+    # 已执行的工具调用轮数
+    tool_iterations: int
 
 
 # 系统提示模板，告诉模型可用的工具
@@ -27,21 +41,7 @@ SYSTEM_PROMPT = """你是一个有用的AI助手，具有访问多种工具的
 可用工具:
 {tools}
 
-使用以下格式：
-
-用户问题：用户的问题
-思考：你对如何回答的思考过程
-工具调用 (如果需要)：
-{{
-    "name": "工具名称",
-    "input": {{
-        "参数名": "参数值"
-    }}
-}}
-行动后思考：在使用工具后你的思考
-回答：对用户问题的最终回答
-
-开始!
+需要时请直接调用工具，拿到工具结果后再给出对用户问题的最终回答。
 """
 
 
@@ -50,7 +50,7 @@ def _format_tools_for_prompt() -> str:
     tools_desc = []
     for name, tool in TOOLS.items():
         params = []
-        schema = tool.input_schema.model_json_schema()
+        schema = tool._schema()
         properties = schema.get("properties", {})
         for param_name, param_info in properties.items():
             param_type = param_info.get("type", "string")
@@ -68,142 +68,318 @@ def _format_tools_for_prompt() -> str:
     return "\n\n".join(tools_desc)
 
 
-def _parse_tool_calls(output: str) -> List[Dict[str, Any]]:
-    """从模型输出中解析工具调用"""
-    tool_calls = []
+# TOOLS 在进程生命周期内不变，工具描述和系统提示只需在加载时渲染一次。
+# 系统提示始终作为消息的固定前缀发送，以便模型服务商复用前缀缓存，
+# 因此会话期间不得修改工具描述，动态内容只能追加在消息末尾。
+_TOOLS_DESC = _format_tools_for_prompt()
+_SYSTEM_PROMPT_RENDERED = SYSTEM_PROMPT.format(tools=_TOOLS_DESC)
+
+
+def _tool_definitions() -> List[Dict[str, Any]]:
+    """将已注册工具转换为原生函数调用所需的工具定义"""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool._schema(),
+            },
+        }
+        for tool in TOOLS.values()
+    ]
+
+
+# 每次请求最多执行的工具调用轮数，达到后要求模型直接给出回答
+_MAX_TOOL_ITERATIONS = 2
+
+# 聊天历史中需要保留的角色
+_HISTORY_ROLES = ("user", "assistant")
+
+# 提示问题可能需要调用工具的关键词
+_TOOL_KEYWORDS = (
+    "搜索", "搜一下", "查一下", "查询", "查找", "最新", "新闻", "今天", "今日", "现在", "实时",
+    "热榜", "热搜", "知乎", "search", "latest", "news", "today", "trending", "zhihu",
+)
+
+# 超过该长度的问题通常较复杂，交给完整的 Agent 流程处理
+_FAST_PATH_MAX_LENGTH = 200
+
+
+def needs_tools(question: str) -> bool:
+    """
+    粗略判断问题是否可能需要调用工具
+    
+    Args:
+        question: 用户问题
+        
+    Returns:
+        可能需要工具时返回 True，此时应运行完整的 Agent 流程
+    """
+    if len(question) > _FAST_PATH_MAX_LENGTH:
+        return True
+    lowered = question.lower()
+    return any(keyword in lowered for keyword in _TOOL_KEYWORDS)
+
+
+def _build_prompt_messages(question: str, chat_history: List[Dict[str, str]]) -> list:
+    """构建固定前缀（系统提示和历史消息）加当前问题的消息列表"""
+    messages = [SystemMessage(content=_SYSTEM_PROMPT_RENDERED)]
+    messages.extend(convert_to_messages([
+        {"role": msg["role"], "content": msg.get("content", "")}
+        for msg in chat_history
+        if msg.get("role") in _HISTORY_ROLES
+    ]))
+    
+    # 动态内容追加在末尾
+    messages.append(HumanMessage(content=question))
+    return messages
+
+
+def bind_agent_tools(llm: ChatGoogleGenerativeAI) -> Runnable:
+    """为LLM绑定所有已注册工具的原生工具调用"""
+    return llm.bind_tools(_tool_definitions())
+
+
+async def generate_direct_response(
+    llm: Union[Runnable, MicroBatcher],
+    question: str,
+    chat_history: List[Dict[str, str]]
+) -> Optional[str]:
+    """
+    不经过 LangGraph，直接调用LLM回答问题
+    
+    Args:
+        llm: 已绑定工具的LLM（见 bind_agent_tools）或合并并发请求的批处理器
+        question: 用户问题
+        chat_history: 聊天历史记录
+        
+    Returns:
+        模型的回答；模型请求调用工具时返回 None，此时应改为运行完整的 Agent 流程
+    """
+    response = await llm.ainvoke(_build_prompt_messages(question, chat_history))
+    if getattr(response, "tool_calls", None):
+        return None
+    return response.content
+
+
+def _complete_tool_call(chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """将合并完整的工具调用片段转换为工具调用，参数无法解析时返回 None"""
     try:
-        # 查找工具调用部分（在 "工具调用" 和 "行动后思考" 之间）
-        if "工具调用" in output:
-            parts = output.split("工具调用")
-            if len(parts) > 1:
-                tool_part = parts[1].split("行动后思考")[0]
-                
-                # 提取JSON对象（可能有多个）
-                import re
-                json_patterns = re.findall(r'({[^{}]*})', tool_part)
-                for pattern in json_patterns:
-                    try:
-                        tool_call = json.loads(pattern)
-                        if "name" in tool_call and "input" in tool_call:
-                            tool_calls.append(tool_call)
-                    except json.JSONDecodeError:
-                        pass
-    except Exception:
-        pass
-    
-    return tool_calls
-
-
-async def _process_tool_calls(state: AgentState) -> AgentState:
-    """处理工具调用，执行工具"""
+        args = orjson.loads(chunk.get("args") or "{}")
+    except orjson.JSONDecodeError:
+        return None
+    if not chunk.get("name") or not isinstance(args, dict):
+        return None
+    
+    return {
+        "id": chunk.get("id") or f"call_{chunk.get('index')}",
+        "name": chunk["name"],
+        "input": args
+    }
+
+
+async def _process_tool_calls(state: AgentState) -> Dict[str, Any]:
+    """处理工具调用，并发执行相互独立的工具"""
     tool_calls = state.get("tool_calls", [])
+    pending_tools = state.get("pending_tools") or {}
+    
+    # 只保留已注册的工具，顺序与 tool_calls 保持一致
+    calls = [call for call in tool_calls if call.get("name") in TOOLS]
+    # 流式生成期间已开始执行的工具直接等待其结果，其余的此时再执行
+    futures = [
+        pending_tools.get(call["id"]) or TOOLS[call["name"]].run(call.get("input", {}))
+        for call in calls
+    ]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    
     tool_results = []
+    tool_errors = False
+    for call, result in zip(calls, results):
+        tool_name = call["name"]
+        if isinstance(result, Exception) or result.degraded:
+            tool_errors = True
+        if isinstance(result, Exception):
+            # 如果工具执行出错，记录错误信息
+            tool_results.append({
+                "tool_call_id": call["id"],
+                "tool_name": tool_name,
+                "error": str(result)
+            })
+        else:
+            tool_results.append({
+                "tool_call_id": call["id"],
+                "tool_name": tool_name,
+                "result": result.model_dump()
+            })
     
-    for call in tool_calls:
-        tool_name = call.get("name")
-        tool_input = call.get("input", {})
-        
-        tool = TOOLS.get(tool_name)
-        if tool:
-            try:
-                result = await tool.run(tool_input)
-                tool_results.append({
-                    "tool_name": tool_name,
-                    "result": result.model_dump()
-                })
-            except Exception as e:
-                # 如果工具执行出错，记录错误信息
-                tool_results.append({
-                    "tool_name": tool_name,
-                    "error": str(e)
-                })
-    
-    return {"tool_results": tool_results, **state}
+    # 只返回变化的部分，由 LangGraph 合并到状态中
+    return {
+        "tool_results": tool_results,
+        "executed_tools": [call["name"] for call in calls],
+        "tool_errors": tool_errors,
+        "pending_tools": {},
+        "tool_iterations": state.get("tool_iterations", 0) + 1
+    }
 
 
 def _should_use_tools(state: AgentState) -> str:
     """决定是否需要使用工具"""
     tool_calls = state.get("tool_calls", [])
-    if tool_calls:
+    if tool_calls and state.get("tool_iterations", 0) < _MAX_TOOL_ITERATIONS:
         return "use_tools"
     return "finish"
 
 
-def _generate_response(state: AgentState, llm: ChatGoogleGenerativeAI) -> AgentState:
-    """生成用户问题的最终回答"""
-    question = state["question"]
-    chat_history = state.get("chat_history", [])
+async def _generate_response(
+    state: AgentState,
+    llm: ChatGoogleGenerativeAI,
+    allow_tools: bool = True
+) -> Dict[str, Any]:
+    """生成用户问题的最终回答，allow_tools 为 False 时忽略模型发出的工具调用"""
+    history = state.get("messages", [])
     tool_results = state.get("tool_results", [])
     
-    # 构建提示
-    tools_desc = _format_tools_for_prompt()
-    system_prompt = SYSTEM_PROMPT.format(tools=tools_desc)
-    
-    # 构建历史消息
-    messages = []
-    for msg in chat_history:
-        role = msg.get("role")
-        content = msg.get("content", "")
-        if role == "user":
-            messages.append(HumanMessage(content=content))
-        elif role == "assistant":
-            messages.append(AIMessage(content=content))
-    
-    # 添加当前问题和工具结果
-    current_prompt = f"用户问题: {question}\n"
-    
-    if tool_results:
-        current_prompt += "工具执行结果:\n"
-        for result in tool_results:
-            tool_name = result.get("tool_name")
+    # 本轮新增的消息
+    new_messages = []
+    if not history:
+        # 首轮构建固定前缀：系统提示在前，随后是历史消息。
+        # 历史消息只在首轮批量转换一次，之后各轮直接复用 state["messages"]
+        new_messages.extend(_build_prompt_messages(state["question"], state.get("chat_history", [])))
+    elif state.get("tool_calls"):
+        # 工具执行后，为每个工具调用追加一条结构化的 ToolMessage
+        results_by_id = {result["tool_call_id"]: result for result in tool_results or []}
+        for call in state["tool_calls"]:
+            result = results_by_id.get(call["id"], {"error": f"未知工具: {call['name']}"})
             if "error" in result:
-                current_prompt += f"{tool_name} 执行失败: {result['error']}\n"
+                content = f"执行失败: {result['error']}"
             else:
-                result_data = result.get("result", {})
-                current_prompt += f"{tool_name} 执行结果: {json.dumps(result_data, ensure_ascii=False)}\n"
+                content = orjson.dumps(result["result"]).decode()
+            new_messages.append(ToolMessage(
+                content=content,
+                tool_call_id=call["id"],
+                name=call["name"]
+            ))
+    
+    tool_calls = []
+    pending_tools = {}
     
-    messages.append(HumanMessage(content=current_prompt))
+    def dispatch(chunk: Dict[str, Any]) -> None:
+        """解析完整的工具调用并立即开始执行"""
+        if not allow_tools:
+            # 工具调用轮数已达上限，之后不会再执行工具，也不会等待其结果
+            return
+        call = _complete_tool_call(chunk)
+        if call is None:
+            return
+        tool_calls.append(call)
+        tool = TOOLS.get(call["name"])
+        if tool:
+            pending_tools[call["id"]] = asyncio.create_task(tool.run(call["input"]))
     
-    # 调用LLM生成回答
-    response = llm.invoke(messages)
+    # 流式调用LLM生成回答，工具调用一旦完整即开始执行，与后续生成重叠
+    full = None
+    dispatched = 0
+    try:
+        async for chunk in llm.astream(history + new_messages):
+            full = chunk if full is None else full + chunk
+            # 出现新的工具调用片段时，之前的工具调用参数都已完整
+            call_chunks = full.tool_call_chunks
+            while dispatched < len(call_chunks) - 1:
+                dispatch(call_chunks[dispatched])
+                dispatched += 1
+    except BaseException:
+        # 生成失败或被取消时，已开始执行的工具任务不会再被等待，需要一并取消
+        for task in pending_tools.values():
+            task.cancel()
+        raise
     
-    # 解析输出，查找工具调用
-    output = response.content
-    tool_calls = _parse_tool_calls(output)
+    if full is None:
+        response = AIMessage(content="")
+    else:
+        # 生成结束后，剩余的工具调用也已完整
+        while dispatched < len(full.tool_call_chunks):
+            dispatch(full.tool_call_chunks[dispatched])
+            dispatched += 1
+        response = message_chunk_to_message(full)
+        # 保证消息中记录的工具调用ID与后续 ToolMessage 的 tool_call_id 一致
+        response.tool_calls = [
+            {"name": call["name"], "args": call["input"], "id": call["id"], "type": "tool_call"}
+            for call in tool_calls
+        ]
+    new_messages.append(response)
     
-    # 更新状态
-    new_state = {
-        **state,
-        "messages": messages,
-        "tool_calls": tool_calls
+    # 只返回变化的部分，由 LangGraph 合并到状态中
+    return {
+        "messages": new_messages,
+        "tool_calls": tool_calls,
+        "pending_tools": pending_tools
     }
+
+
+def create_llm(
+    model_name: str = "gemini-pro",
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    max_retries: int = 2
+) -> ChatGoogleGenerativeAI:
+    """
+    创建LLM客户端
+    
+    客户端内部的连接通道会在多次调用间复用，应在进程内只创建一次并共享。
     
-    return new_state
+    Args:
+        model_name: 使用的LLM模型名称，默认为 gemini-pro
+        temperature: 模型温度参数
+        timeout: 单次请求超时时间（秒）
+        max_retries: 请求失败时的最大重试次数
+        
+    Returns:
+        LLM客户端
+    """
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        temperature=temperature,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        timeout=timeout,
+        max_retries=max_retries
+    )
 
 
-def create_agent_executor(model_name: str = "gemini-pro", temperature: float = 0.7):
+def create_agent_executor(
+    model_name: str = "gemini-pro",
+    temperature: float = 0.7,
+    llm: Optional[ChatGoogleGenerativeAI] = None
+):
     """
     创建LangGraph代理执行器
     
     Args:
         model_name: 使用的LLM模型名称，默认为 gemini-pro
         temperature: 模型温度参数
+        llm: 共享的LLM客户端（可选），未提供时新建
         
     Returns:
         LangGraph执行器
     """
     # 初始化LLM
-    llm = ChatGoogleGenerativeAI(
-        model=model_name,
-        temperature=temperature,
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
+    if llm is None:
+        llm = create_llm(model_name=model_name, temperature=temperature)
+    # 绑定原生工具调用
+    tool_llm = bind_agent_tools(llm)
+    # 工具调用轮数达到上限后使用的LLM，禁止再调用工具，只能给出最终回答
+    answer_llm = llm.bind_tools(_tool_definitions(), tool_choice="none")
     
     # 创建 LangGraph
     workflow = StateGraph(AgentState)
     
+    async def generate_response(state: AgentState) -> Dict[str, Any]:
+        if state.get("tool_iterations", 0) >= _MAX_TOOL_ITERATIONS:
+            return await _generate_response(state, answer_llm, allow_tools=False)
+        return await _generate_response(state, tool_llm)
+    
     # 添加节点
-    workflow.add_node("generate_response", lambda state: _generate_response(state, llm))
+    workflow.add_node("generate_response", generate_response)
     workflow.add_node("process_tool_calls", _process_tool_calls)
     
     # 添加边和条件
@@ -218,7 +394,7 @@ def create_agent_executor(model_name: str = "gemini-pro", temperature: float = 0
     )
     workflow.add_edge("process_tool_calls", "generate_response")
     
-    # 编译图
-    app = workflow.compile()
+    # 编译图，不需要跨请求保存状态，因此不启用检查点
+    app = workflow.compile(checkpointer=None)
     
     return app 
\ No newline at end of file
@@ -13,6 +13,24 @@ API_DESCRIPTION = "基于FastAPI和LangGraph构建的多功能问答Agent系统
 # LLM 配置
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# 看起来无需工具的问题是否先不经过 Agent 流程直接调用LLM；
+# 模型仍请求工具时会回退到完整流程，多花一次LLM调用，因此默认关闭
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "False").lower() in ("true", "1", "t")
+
+# LLM 微批处理配置：合并短时间内并发到达的快速路径请求。
+# 批处理器只用于快速路径的直接LLM调用，需同时开启 FAST_PATH_ENABLED 才会生效，
+# Agent 流程中的LLM调用不经过批处理器。
+# Gemini 没有批量补全接口，合并后仍是逐个并发请求，只会增加等待时间，
+# 因此默认等待时间为 0，即关闭合并；仅在使用支持批量接口的模型时开启
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "16"))
+LLM_BATCH_WAIT_MS = float(os.getenv("LLM_BATCH_WAIT_MS", "0"))
+
+# 响应缓存配置
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
 
 # 服务器配置
 HOST = os.getenv("HOST", "0.0.0.0")
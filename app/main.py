@@ -1,22 +1,39 @@
 import json
 import os
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from langchain_core.messages import AIMessageChunk
 from pydantic import BaseModel, Field
 
-from app.config import API_TITLE, API_VERSION, API_DESCRIPTION, LLM_MODEL, LLM_TEMPERATURE, HOST, PORT, DEBUG
-from app.agent import create_agent_executor
-from app.tools import TOOLS
+from app.config import (
+    API_TITLE, API_VERSION, API_DESCRIPTION, LLM_MODEL, LLM_TEMPERATURE, LLM_TIMEOUT, LLM_MAX_RETRIES,
+    HOST, PORT, DEBUG, FAST_PATH_ENABLED, LLM_BATCH_SIZE, LLM_BATCH_WAIT_MS, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL,
+)
+from app.agent import MicroBatcher, ResponseCache, bind_agent_tools, create_agent_executor, create_llm, generate_direct_response, needs_tools
+from app.tools import TOOLS, close_http_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期管理，退出时关闭共享的HTTP客户端和LLM批处理器"""
+    yield
+    await llm_batcher.aclose()
+    await close_http_clients()
+
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title=API_TITLE,
     version=API_VERSION,
     description=API_DESCRIPTION,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # 添加 CORS 中间件
@@ -28,12 +45,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的响应（如包含工具结果的回答）
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+# 共享的 LLM 客户端，复用底层连接
+llm = create_llm(
+    model_name=LLM_MODEL,
+    temperature=LLM_TEMPERATURE,
+    timeout=LLM_TIMEOUT,
+    max_retries=LLM_MAX_RETRIES
+)
+
+# 直接LLM调用的批处理器（默认不合并），快速路径同样绑定工具，以便模型仍可请求工具
+llm_batcher = MicroBatcher(
+    bind_agent_tools(llm),
+    max_batch_size=LLM_BATCH_SIZE,
+    max_wait=LLM_BATCH_WAIT_MS / 1000
+)
+
 # 获取 Agent 执行器
 agent_executor = create_agent_executor(
     model_name=LLM_MODEL, 
-    temperature=LLM_TEMPERATURE
+    temperature=LLM_TEMPERATURE,
+    llm=llm
 )
 
+# 响应缓存，重复的问题无需再次运行 Agent
+response_cache = ResponseCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+# 工具信息在进程生命周期内不变，启动时预先计算
+TOOL_LIST = [tool.to_dict() for tool in TOOLS.values()]
+
 # 请求模型
 class QuestionRequest(BaseModel):
     question: str = Field(..., description="用户提问的问题")
@@ -59,10 +101,7 @@ async def root():
 @app.get("/tools", response_model=List[ToolInfo])
 async def list_tools():
     """列出所有可用的工具"""
-    tool_list = []
-    for name, tool in TOOLS.items():
-        tool_list.append(tool.to_dict())
-    return tool_list
+    return TOOL_LIST
 
 @app.post("/chat", response_model=AgentResponse)
 async def chat(request: QuestionRequest):
@@ -76,44 +115,100 @@ async def chat(request: QuestionRequest):
         代理回答和工具调用信息
     """
     try:
-        # 运行 LangGraph
-        initial_state = {
-            "question": request.question,
-            "chat_history": request.chat_history,
-            "messages": [],
-            "tool_calls": []
-        }
-        
-        # 异步执行代理
-        result = await agent_executor.ainvoke(initial_state)
+        cache_key = ResponseCache.make_key(
+            request.question, request.chat_history, LLM_MODEL, LLM_TEMPERATURE
+        )
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            return AgentResponse(**cached)
         
-        # 从最后一个输出中提取回答
         output = None
-        tool_calls = result.get("tool_calls", [])
-        tool_results = result.get("tool_results", [])
+        tool_calls = []
+        tool_results = []
+        executed_tools = []
+        tool_errors = False
         
-        # 将最后一个LLM输出解析为回答
-        messages = result.get("messages", [])
-        if messages and len(messages) > 0:
-            last_message = messages[-1]
-            if hasattr(last_message, "content"):
-                output = last_message.content
-                
-                # 尝试提取最终回答
-                if "回答：" in output:
-                    answer_parts = output.split("回答：")
-                    if len(answer_parts) > 1:
-                        output = answer_parts[-1].strip()
+        use_graph = True
+        if FAST_PATH_ENABLED and not needs_tools(request.question):
+            # 问题看起来不需要工具时直接调用LLM，跳过 LangGraph 流程；
+            # 模型仍请求调用工具时回退到完整的 Agent 流程
+            output = await generate_direct_response(llm_batcher, request.question, request.chat_history)
+            use_graph = output is None
         
-        return AgentResponse(
+        if use_graph:
+            # 运行 LangGraph
+            initial_state = {
+                "question": request.question,
+                "chat_history": request.chat_history,
+                "messages": [],
+                "tool_calls": [],
+                "executed_tools": [],
+                "tool_errors": False
+            }
+            
+            # 异步执行代理
+            result = await agent_executor.ainvoke(initial_state)
+            
+            # 从最后一个输出中提取回答
+            tool_calls = result.get("tool_calls", [])
+            tool_results = result.get("tool_results", [])
+            executed_tools = result.get("executed_tools", [])
+            tool_errors = result.get("tool_errors", False)
+            
+            # 最后一条消息即为LLM的最终回答
+            messages = result.get("messages", [])
+            if messages and hasattr(messages[-1], "content"):
+                output = messages[-1].content
+        
+        response = AgentResponse(
             answer=output or "抱歉，我无法处理您的请求。",
             tool_calls=tool_calls,
             tool_results=tool_results
         )
         
+        # 只缓存成功的回答：所有轮次执行过的工具都必须是信息查询类工具，
+        # 且没有工具执行失败或只返回兜底内容，以免短暂故障时的回答被反复复用
+        if output and not tool_errors and all(TOOLS[name].informational for name in executed_tools):
+            await response_cache.set(cache_key, response.model_dump())
+        
+        return response
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理请求时出错: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: QuestionRequest):
+    """
+    流式聊天接口，边生成边返回模型的回答
+    
+    Args:
+        request: 包含用户问题和聊天历史的请求
+    
+    Returns:
+        以 Server-Sent Events 格式逐段返回回答文本的流式响应
+    """
+    initial_state = {
+        "question": request.question,
+        "chat_history": request.chat_history,
+        "messages": [],
+        "tool_calls": []
+    }
+    
+    async def generate():
+        # 只转发LLM生成的文本片段，工具调用片段不返回给客户端
+        async for chunk, metadata in agent_executor.astream(initial_state, stream_mode="messages"):
+            if (
+                isinstance(chunk, AIMessageChunk)
+                and isinstance(chunk.content, str)
+                and chunk.content
+                and metadata.get("langgraph_node") == "generate_response"
+            ):
+                # 每个文本片段作为一个SSE事件，多行内容逐行加上 data: 前缀
+                yield "".join(f"data: {line}\n" for line in chunk.content.split("\n")) + "\n"
+    
+    # GZip 中间件不会压缩 text/event-stream，流式输出不会被缓冲
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
 @app.get("/health")
 async def health_check():
     """健康检查接口"""
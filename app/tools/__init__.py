@@ -1,4 +1,5 @@
 from app.tools.base import BaseTool
+from app.tools.http_client import HTTP_CLIENT, close_http_clients
 from app.tools.search import SearchTool
 from app.tools.zhihu import ZhihuHotTool
 
@@ -8,4 +9,4 @@ TOOLS = {
     "zhihu_hot": ZhihuHotTool(),
 }
 
-__all__ = ["TOOLS", "BaseTool", "SearchTool", "ZhihuHotTool"] 
\ No newline at end of file
+__all__ = ["TOOLS", "HTTP_CLIENT", "BaseTool", "SearchTool", "ZhihuHotTool", "close_http_clients"] 
\ No newline at end of file
@@ -1,14 +1,19 @@
+import functools
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Type, TypeVar, Union, Generic
+import httpx
 from pydantic import BaseModel, Field
 
+from app.tools.http_client import HTTP_CLIENT
+
 # 工具输入基类
 class BaseToolInput(BaseModel):
     pass
 
 # 工具输出基类
 class BaseToolOutput(BaseModel):
-    pass
+    # 工具未能获取到有效数据、返回的是空结果或兜底内容时为 True，不包含在输出中
+    degraded: bool = Field(False, exclude=True)
 
 # 工具参数和返回值类型变量
 T = TypeVar('T', bound=BaseToolInput)
@@ -20,6 +25,10 @@ class BaseTool(ABC, Generic[T, U]):
     description: str
     input_schema: Type[T]
     output_schema: Type[U]
+    # 信息查询类工具的结果可被响应缓存复用，执行操作的工具应设为 False
+    informational: bool = True
+    # 共享的HTTP客户端
+    _client: httpx.AsyncClient = HTTP_CLIENT
     
     def __init__(self, name: str = None, description: str = None):
         """
@@ -33,6 +42,18 @@ class BaseTool(ABC, Generic[T, U]):
             self.name = name
         if description:
             self.description = description
+        self._cached_dict: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    @functools.cache
+    def _schema(cls) -> Dict[str, Any]:
+        """
+        获取输入参数的 JSON Schema，每个工具类只计算一次
+        
+        Returns:
+            输入模型的 JSON Schema
+        """
+        return cls.input_schema.model_json_schema()
     
     @abstractmethod
     async def _run(self, input_data: T) -> U:
@@ -73,7 +94,11 @@ class BaseTool(ABC, Generic[T, U]):
         Returns:
             工具描述信息的字典
         """
-        schema = self.input_schema.model_json_schema()
+        # 工具的输入模式不会变化，结果只需计算一次
+        if self._cached_dict is not None:
+            return self._cached_dict
+        
+        schema = self._schema()
         required = schema.get("required", [])
         properties = schema.get("properties", {})
         
@@ -88,8 +113,9 @@ class BaseTool(ABC, Generic[T, U]):
             }
             parameters.append(param)
         
-        return {
+        self._cached_dict = {
             "name": self.name,
             "description": self.description,
             "parameters": parameters
-        } 
\ No newline at end of file
+        }
+        return self._cached_dict 
\ No newline at end of file
@@ -0,0 +1,30 @@
+import ssl
+
+import certifi
+import httpx
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# 使用 certifi 的CA证书构建一次SSL上下文，供共享客户端复用
+_SSL_CTX = ssl.create_default_context(cafile=certifi.where())
+
+
+def _create_client(**kwargs) -> httpx.AsyncClient:
+    """创建复用连接池的异步HTTP客户端"""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+        headers={"User-Agent": USER_AGENT},
+        verify=_SSL_CTX,
+        **kwargs,
+    )
+
+
+# 所有工具共享的HTTP客户端，避免每次调用都重新建立连接和TLS握手
+HTTP_CLIENT = _create_client()
+
+
+async def close_http_clients() -> None:
+    """关闭共享的HTTP客户端，应用退出时调用"""
+    await HTTP_CLIENT.aclose()
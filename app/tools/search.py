@@ -1,7 +1,7 @@
-import httpx
+import asyncio
 from typing import List, Dict, Any, Optional
 from pydantic import Field, BaseModel
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 
 from app.tools.base import BaseTool, BaseToolInput, BaseToolOutput
 
@@ -17,6 +17,38 @@ class SearchResultItem(BaseModel):
 class SearchOutput(BaseToolOutput):
     results: List[SearchResultItem] = Field(..., description="搜索结果列表")
 
+def _parse_bing_html(content: bytes, num_results: int) -> List[SearchResultItem]:
+    """
+    解析Bing搜索结果页面
+    
+    Args:
+        content: 页面的原始字节，直接解析以避免额外的解码
+        num_results: 最多返回的结果数量
+        
+    Returns:
+        搜索结果列表
+    """
+    results = []
+    tree = HTMLParser(content)
+    search_results = tree.css('.b_algo')[:num_results]
+    
+    for result in search_results:
+        title_elem = result.css_first('h2 > a')
+        snippet_elem = result.css_first('.b_caption p')
+        
+        if title_elem and snippet_elem:
+            title = title_elem.text().strip()
+            link = title_elem.attributes.get('href') or ''
+            snippet = snippet_elem.text().strip()
+            
+            results.append(SearchResultItem(
+                title=title,
+                link=link,
+                snippet=snippet
+            ))
+    
+    return results
+
 class SearchTool(BaseTool[SearchInput, SearchOutput]):
     """搜索引擎工具"""
     name = "search"
@@ -34,41 +66,18 @@ class SearchTool(BaseTool[SearchInput, SearchOutput]):
         Returns:
             搜索结果列表
         """
-        # 使用httpx发送搜索请求（这里使用Bing作为示例）
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        # 使用共享的HTTP客户端发送搜索请求（这里使用Bing作为示例）
+        client = self._client
+        response = await client.get(
+            f"https://www.bing.com/search",
+            params={"q": input_data.query},
+        )
         
-        async with httpx.AsyncClient() as client:
-            # 使用Bing搜索
-            response = await client.get(
-                f"https://www.bing.com/search",
-                params={"q": input_data.query},
-                headers=headers
+        # 解析结果，HTML解析是CPU密集型操作，放到工作线程中执行以免阻塞事件循环
+        results = []
+        if response.status_code == 200:
+            results = await asyncio.to_thread(
+                _parse_bing_html, response.content, input_data.num_results
             )
-            
-            # 解析结果
-            results = []
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                search_results = soup.select('.b_algo')
-                
-                for i, result in enumerate(search_results):
-                    if i >= input_data.num_results:
-                        break
-                        
-                    title_elem = result.select_one('h2 > a')
-                    snippet_elem = result.select_one('.b_caption p')
-                    
-                    if title_elem and snippet_elem:
-                        title = title_elem.text
-                        link = title_elem.get('href', '')
-                        snippet = snippet_elem.text
-                        
-                        results.append(SearchResultItem(
-                            title=title,
-                            link=link,
-                            snippet=snippet
-                        ))
-            
-            return SearchOutput(results=results) 
\ No newline at end of file
+        
+        return SearchOutput(results=results, degraded=not results) 
\ No newline at end of file
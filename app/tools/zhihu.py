@@ -1,8 +1,9 @@
-import httpx
+import asyncio
+from itertools import islice
 from typing import List, Dict, Any, Optional
+
+import orjson
 from pydantic import Field, BaseModel
-from bs4 import BeautifulSoup
-import json
 
 from app.tools.base import BaseTool, BaseToolInput, BaseToolOutput
 
@@ -34,118 +35,110 @@ class ZhihuHotTool(BaseTool[ZhihuHotInput, ZhihuHotOutput]):
         Returns:
             知乎热榜列表
         """
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        limit = input_data.limit
         
-        items = []
+        # 同时请求所有数据源，采用最先成功返回的结果
+        fetchers = [self._fetch_zhihu_api, self._fetch_tophub, self._fetch_tenapi]
+        tasks = [asyncio.create_task(fetch(limit)) for fetch in fetchers]
         
-        try:
-            # 方法1：使用知乎API获取热榜
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.get(
-                    "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total",
-                    headers=headers,
-                    params={"limit": 50},  # 获取更多条目，后面会截取
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    hot_items = data.get("data", [])
-                    
-                    for i, item in enumerate(hot_items):
-                        if i >= input_data.limit:
-                            break
-                        
-                        target = item.get("target", {})
-                        title = target.get("title", "")
-                        url = f"https://www.zhihu.com/question/{target.get('id')}"
-                        metrics = item.get("detail_text", "")
-                        
-                        items.append(ZhihuHotItem(
-                            title=title,
-                            url=url,
-                            hot_value=metrics
-                        ))
-                else:
-                    # 如果API请求失败，尝试备用方法
-                    items = await self._fallback_method(input_data.limit)
-        except Exception as e:
-            # 如果出现异常，尝试备用方法
-            items = await self._fallback_method(input_data.limit)
-            
-        return ZhihuHotOutput(items=items)
-    
-    async def _fallback_method(self, limit: int) -> List[ZhihuHotItem]:
-        """备用方法：使用第三方API或镜像站获取知乎热榜"""
         items = []
-        
-        # 尝试使用今日热榜API
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
         try:
-            async with httpx.AsyncClient() as client:
-                # 使用今日热榜开放API：https://www.tophub.fun
-                response = await client.get(
-                    "https://api.tophub.fun/v2/GetAllInfoGzip?id=1&page=0",
-                    headers=headers
-                )
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except Exception:
+                    continue
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    hot_items = data.get("Data", {}).get("data", [])
-                    
-                    for i, item in enumerate(hot_items):
-                        if i >= limit:
-                            break
-                        
-                        title = item.get("Title", "")
-                        url = item.get("Url", "")
-                        hot_value = item.get("hotValue", "")
-                        
-                        items.append(ZhihuHotItem(
-                            title=title,
-                            url=url,
-                            hot_value=hot_value
-                        ))
-                    
-                    return items
-        except Exception:
-            pass
+                # 条目数量足够即可结束，否则保留目前最完整的结果
+                if len(result) > len(items):
+                    items = result
+                if len(items) >= limit:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
         
-        # 如果仍然失败，使用更多备用方法
-        try:
-            async with httpx.AsyncClient() as client:
-                # 使用另一个第三方API
-                response = await client.get(
-                    "https://tenapi.cn/zhihuresou/",
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    hot_items = data.get("list", [])
-                    
-                    for i, item in enumerate(hot_items):
-                        if i >= limit:
-                            break
-                        
-                        title = item.get("name", "")
-                        url = item.get("url", "")
-                        
-                        items.append(ZhihuHotItem(
-                            title=title,
-                            url=url,
-                            hot_value=None
-                        ))
-        except Exception:
+        degraded = not items
+        if degraded:
             # 如果所有方法都失败，返回一个带有错误信息的条目
             items.append(ZhihuHotItem(
                 title="无法获取知乎热榜，可能是API限制或网络问题",
                 url="https://www.zhihu.com/hot",
                 hot_value=None
             ))
+            
+        return ZhihuHotOutput(items=items, degraded=degraded)
+    
+    async def _fetch_zhihu_api(self, limit: int) -> List[ZhihuHotItem]:
+        """使用知乎API获取热榜"""
+        response = await self._client.get(
+            "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total",
+            params={"limit": 50},  # 获取更多条目，后面会截取
+        )
+        response.raise_for_status()
+        
+        items = []
+        data = orjson.loads(response.content)
+        hot_items = data.get("data", [])
+        
+        for item in islice(hot_items, limit):
+            target = item.get("target", {})
+            title = target.get("title", "")
+            url = f"https://www.zhihu.com/question/{target.get('id')}"
+            metrics = item.get("detail_text", "")
+            
+            # 字段均为自行提取的字符串，跳过 pydantic 校验
+            items.append(ZhihuHotItem.model_construct(
+                title=title,
+                url=url,
+                hot_value=metrics
+            ))
+        
+        return items
+    
+    async def _fetch_tophub(self, limit: int) -> List[ZhihuHotItem]:
+        """备用方法：使用今日热榜开放API获取知乎热榜：https://www.tophub.fun"""
+        response = await self._client.get(
+            "https://api.tophub.fun/v2/GetAllInfoGzip?id=1&page=0"
+        )
+        response.raise_for_status()
+        
+        items = []
+        data = orjson.loads(response.content)
+        hot_items = data.get("Data", {}).get("data", [])
+        
+        for item in islice(hot_items, limit):
+            title = item.get("Title", "")
+            url = item.get("Url", "")
+            hot_value = str(item.get("hotValue", ""))
+            
+            items.append(ZhihuHotItem.model_construct(
+                title=title,
+                url=url,
+                hot_value=hot_value
+            ))
+        
+        return items
+    
+    async def _fetch_tenapi(self, limit: int) -> List[ZhihuHotItem]:
+        """备用方法：使用另一个第三方API获取知乎热榜"""
+        response = await self._client.get(
+            "https://tenapi.cn/zhihuresou/"
+        )
+        response.raise_for_status()
+        
+        items = []
+        data = orjson.loads(response.content)
+        hot_items = data.get("list", [])
+        
+        for item in islice(hot_items, limit):
+            title = item.get("name", "")
+            url = item.get("url", "")
+            
+            items.append(ZhihuHotItem.model_construct(
+                title=title,
+                url=url,
+                hot_value=None
+            ))
         
         return items 
\ No newline at end of file
@@ -0,0 +1 @@
+# 将项目根目录加入导入路径，使直接运行 pytest 时可以导入 app 包
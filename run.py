@@ -1,6 +1,7 @@
 import uvicorn
 from app.config import HOST, PORT, DEBUG
 
+# Uvicorn 只支持 HTTP/1.1，需要 HTTP/2 时请参考 README 使用 Hypercorn 或反向代理
 if __name__ == "__main__":
     print(f"启动服务器 - 监听：{HOST}:{PORT}, 调试模式：{'开启' if DEBUG else '关闭'}")
     uvicorn.run("app.main:app", host=HOST, port=PORT, reload=DEBUG) 
\ No newline at end of file
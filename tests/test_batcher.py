@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.agent.batcher import MicroBatcher
+
+
+class FakeLLM:
+    """记录每次 abatch 调用的假LLM"""
+    
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.batches = []
+    
+    async def ainvoke(self, messages):
+        return f"direct:{messages}"
+    
+    async def abatch(self, inputs, return_exceptions=False):
+        self.batches.append(list(inputs))
+        await asyncio.sleep(self.delay)
+        return [ValueError(m) if m == "boom" else f"reply:{m}" for m in inputs]
+
+
+def test_forwards_directly_when_wait_is_zero():
+    llm = FakeLLM()
+    batcher = MicroBatcher(llm, max_wait=0)
+    
+    assert asyncio.run(batcher.ainvoke("a")) == "direct:a"
+    assert llm.batches == []
+    assert batcher._worker is None
+
+
+def test_merges_concurrent_requests_into_one_batch():
+    llm = FakeLLM()
+    batcher = MicroBatcher(llm, max_wait=0.05)
+    
+    async def main():
+        results = await asyncio.gather(*(batcher.ainvoke(m) for m in ["a", "b", "c"]))
+        await batcher.aclose()
+        return results
+    
+    assert asyncio.run(main()) == ["reply:a", "reply:b", "reply:c"]
+    assert llm.batches == [["a", "b", "c"]]
+
+
+def test_respects_max_batch_size():
+    llm = FakeLLM()
+    batcher = MicroBatcher(llm, max_batch_size=2, max_wait=0.05)
+    
+    async def main():
+        results = await asyncio.gather(*(batcher.ainvoke(m) for m in ["a", "b", "c"]))
+        await batcher.aclose()
+        return results
+    
+    assert asyncio.run(main()) == ["reply:a", "reply:b", "reply:c"]
+    assert llm.batches == [["a", "b"], ["c"]]
+
+
+def test_errors_only_reach_their_own_caller():
+    llm = FakeLLM()
+    batcher = MicroBatcher(llm, max_wait=0.05)
+    
+    async def main():
+        results = await asyncio.gather(
+            batcher.ainvoke("a"), batcher.ainvoke("boom"), return_exceptions=True
+        )
+        await batcher.aclose()
+        return results
+    
+    ok, error = asyncio.run(main())
+    assert ok == "reply:a"
+    assert isinstance(error, ValueError)
+
+
+def test_cancelled_caller_does_not_break_batch():
+    llm = FakeLLM()
+    batcher = MicroBatcher(llm, max_wait=0.05)
+    
+    async def main():
+        cancelled = asyncio.create_task(batcher.ainvoke("a"))
+        kept = asyncio.create_task(batcher.ainvoke("b"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        result = await kept
+        await batcher.aclose()
+        return cancelled, result
+    
+    cancelled, result = asyncio.run(main())
+    assert cancelled.cancelled()
+    assert result == "reply:b"
+    assert llm.batches == [["a", "b"]]
+
+
+def test_aclose_cancels_in_flight_callers():
+    llm = FakeLLM(delay=10)
+    batcher = MicroBatcher(llm, max_wait=0.01)
+    
+    async def main():
+        caller = asyncio.create_task(batcher.ainvoke("a"))
+        await asyncio.sleep(0.05)
+        await batcher.aclose()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+    
+    asyncio.run(main())
+    assert llm.batches == [["a"]]
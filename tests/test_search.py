@@ -0,0 +1,40 @@
+from app.tools.search import _parse_bing_html
+
+BING_HTML = """
+<html><body><ol id="b_results">
+<li class="b_algo">
+  <h2><a href="https://docs.python.org/3/tutorial/">The <strong>Python</strong> Tutorial</a></h2>
+  <div class="b_caption"><p>Learn <strong>Python</strong> programming today.</p></div>
+</li>
+<li class="b_algo">
+  <h2><a href="https://www.python.org/">Welcome to <strong>Python</strong>.org</a></h2>
+  <div class="b_caption"><p>The official home of the <strong>Python</strong> language.</p></div>
+</li>
+<li class="b_algo">
+  <h2><a href="https://example.com/">No snippet</a></h2>
+</li>
+</ol></body></html>
+""".encode()
+
+
+def test_parse_bing_html_keeps_spaces_around_highlights():
+    results = _parse_bing_html(BING_HTML, 5)
+
+    assert [item.model_dump() for item in results] == [
+        {
+            "title": "The Python Tutorial",
+            "link": "https://docs.python.org/3/tutorial/",
+            "snippet": "Learn Python programming today.",
+        },
+        {
+            "title": "Welcome to Python.org",
+            "link": "https://www.python.org/",
+            "snippet": "The official home of the Python language.",
+        },
+    ]
+
+
+def test_parse_bing_html_limits_results():
+    results = _parse_bing_html(BING_HTML, 1)
+
+    assert [item.title for item in results] == ["The Python Tutorial"]